@@ -1,10 +1,104 @@
-import pandas as pd
 import robin_stocks.robinhood as rh
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 import datetime as dt
+import json
+import logging
+import os
+import pathlib
 import pytz
-from time import sleep
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from time import sleep, monotonic
+
+from config import RH_USERNAME, RH_PASSWORD
+
+log = logging.getLogger(__name__)
+
+_TZ = pytz.timezone('US/Eastern')
+_MARKET_OPEN = dt.time(9, 30)
+_MARKET_CLOSE = dt.time(16, 0)
+
+_TERMINAL_STATES = frozenset({'filled', 'cancelled', 'rejected'})
+
+_INSTRUMENT_CACHE_FILE = pathlib.Path.home() / '.cache' / 'robinhood_bot' / 'instruments.json'
+
+# The /instruments/?ids= endpoint caps how many ids one request may carry.
+_INSTRUMENTS_PER_REQUEST = 75
+
+def _orjson_response_json(self, **kwargs):
+    """Drop-in Response.json that decodes with orjson instead of stdlib json. """
+    return orjson.loads(self.content)
+
+# order_type -> (required args, robinhood order function). The function takes
+# the symbol followed by the required args in table order.
+_BUY_ORDER_TABLE = {
+    'fractional_price': (('dollar_amount',), rh.orders.order_buy_fractional_by_price),
+    'fractional_quantity': (('quantity',), rh.orders.order_buy_fractional_by_quantity),
+    'limit': (('price', 'quantity'),
+              lambda symbol, price, quantity: rh.orders.order_buy_limit(symbol, int(quantity), price)),
+    'market': (('quantity',),
+               lambda symbol, quantity: rh.orders.order_buy_market(symbol, int(quantity))),
+}
+
+_SELL_ORDER_TABLE = {
+    'fractional_price': (('dollar_amount',), rh.orders.order_sell_fractional_by_price),
+    'fractional_quantity': (('quantity',), rh.orders.order_sell_fractional_by_quantity),
+    'limit': (('price', 'quantity'),
+              lambda symbol, price, quantity: rh.orders.order_sell_limit(symbol, int(quantity), price)),
+    'market': (('quantity',),
+               lambda symbol, quantity: rh.orders.order_sell_market(symbol, int(quantity))),
+}
+
+def _make_submitter(required, order_fn):
+    """Build a submitter closure with one order type's checks baked in.
 
-from config import RH_USERNAME, RH_PASSWORD 
+    Specializing per order type at import time means submitting an order is a
+    single dict lookup plus one call, with no per-call table unpacking.
+    """
+    checks = tuple((name, name.replace('_', ' ')) for name in required)
+    def submit(symbol, kwargs):
+        values = []
+        for name, label in checks:
+            value = kwargs[name]
+            if value is None:
+                raise ValueError(f"No {label} specified.")
+            if value < 0:
+                raise ValueError(f"Negative {label}.")
+            values.append(value)
+        return order_fn(symbol, *values)
+    return submit
+
+_BUY_DISPATCH = {order_type: _make_submitter(*entry)
+                 for order_type, entry in _BUY_ORDER_TABLE.items()}
+_SELL_DISPATCH = {order_type: _make_submitter(*entry)
+                  for order_type, entry in _SELL_ORDER_TABLE.items()}
+
+def ttl_cache(ttl):
+    """Cache a function's return value for ttl seconds, keyed on its args.
+
+    Cheap memoizer for getters whose upstream data changes slowly, so
+    repeated calls inside the trade loop don't re-issue REST requests.
+    """
+    def decorator(fn):
+        cache = {}
+        @wraps(fn)
+        def wrapper(*args):
+            now = monotonic()
+            hit = cache.get(args)
+            if hit is not None and now - hit[0] < ttl:
+                return hit[1]
+            result = fn(*args)
+            cache[args] = (now, result)
+            return result
+        return wrapper
+    return decorator
 
 class RobinHoodBot:
     def __init__(self, username, password, watchlist=None, stocks=None, strategy=None) -> None:
@@ -19,37 +113,149 @@ class RobinHoodBot:
 
         self._login(username, password)
 
-        self.stocks = stocks
-        if self.stocks is None:
-            self.stocks = []
-        if watchlist is not None:
-            self.stocks = self.get_watchlist(watchlist)
+        self._instrument_cache = self._load_instrument_cache()
+        self._instrument_cache_lock = threading.Lock()
+        self._price_cache = {}
+        self._price_ts = 0.0
+        self._portfolio_ts = 0.0
+        self.strategy = strategy
 
-        self.open_orders = self.get_all_open_stock_orders()
+        # The three startup fetches hit independent endpoints, so run them
+        # concurrently and join; requests releases the GIL during socket I/O.
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            watchlist_future = None
+            if watchlist is not None:
+                watchlist_future = executor.submit(self.get_watchlist, watchlist)
+            orders_future = executor.submit(self.get_all_open_stock_orders)
+            portfolio_future = executor.submit(self.get_portfolio)
 
-        self.get_portfolio()
+            if watchlist_future is not None:
+                self.stocks = watchlist_future.result()
+            else:
+                self.stocks = stocks if stocks is not None else []
+            self.open_orders = orders_future.result()
+            portfolio_future.result()
 
     def _login(self, username, password):
         rh.authentication.login(username, password)
+        # Pool connections to api.robinhood.com so every call after login
+        # reuses one TLS connection instead of re-handshaking each time.
+        rh.helper.SESSION.mount(
+            'https://', HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0))
+        # Decode API payloads with orjson when available; the big responses
+        # (build_holdings, get_all_stock_orders) are several times faster to
+        # parse than with stdlib json.
+        if orjson is not None:
+            Response.json = _orjson_response_json
 
     def logout(self):
         rh.authentication.logout()
 
-    def get_portfolio(self):
+    @staticmethod
+    def _load_instrument_cache():
+        """Hydrate the instrument url -> symbol cache from disk. """
+        try:
+            return json.loads(_INSTRUMENT_CACHE_FILE.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _save_instrument_cache(self):
+        """Atomically persist the instrument cache for future bot runs.
+
+        Serialized with a lock: _resolve_symbols runs on multiple threads
+        during startup, and concurrent saves through the shared temp path
+        could otherwise race each other's os.replace.
         """
-        Get symbols in portfolio. Used to determine if we can sell a position. 
+        with self._instrument_cache_lock:
+            _INSTRUMENT_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            tmp = _INSTRUMENT_CACHE_FILE.with_suffix('.tmp')
+            tmp.write_text(json.dumps(self._instrument_cache))
+            os.replace(tmp, _INSTRUMENT_CACHE_FILE)
+
+    def _resolve_symbols(self, urls):
+        """Resolve instrument urls to stock symbols with one batched request.
+
+        Uncached urls are fetched together via the /instruments/?ids=... endpoint
+        instead of one round trip per url. When more ids are needed than fit in
+        one request, the batches go out concurrently over the keep-alive pool.
+        Instrument ids never change, so results are cached to disk and reused
+        across restarts.
         """
+        new_urls = set(url for url in urls if url not in self._instrument_cache)
+        if new_urls:
+            ids = [url.rstrip('/').rsplit('/', 1)[-1] for url in new_urls]
+            batches = [ids[i:i + _INSTRUMENTS_PER_REQUEST]
+                       for i in range(0, len(ids), _INSTRUMENTS_PER_REQUEST)]
+            if len(batches) == 1:
+                responses = [self._fetch_instruments(batches[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=min(8, len(batches))) as executor:
+                    responses = list(executor.map(self._fetch_instruments, batches))
+            for results in responses:
+                for instrument in results:
+                    self._instrument_cache[instrument['url']] = instrument['symbol']
+            missing = [url for url in new_urls if url not in self._instrument_cache]
+            if missing:
+                with ThreadPoolExecutor(max_workers=min(8, len(missing))) as executor:
+                    for url, symbol in zip(missing, executor.map(self._fetch_symbol, missing)):
+                        self._instrument_cache[url] = symbol
+            self._save_instrument_cache()
+        return {url: self._instrument_cache[url] for url in urls}
+
+    @staticmethod
+    def _fetch_instruments(ids):
+        return rh.helper.request_get('https://api.robinhood.com/instruments/',
+                                     'results', {'ids': ','.join(ids)})
+
+    @staticmethod
+    def _paged_positions():
+        """Yield open stock positions one API page at a time.
+
+        Walks the pagination links directly instead of letting robin_stocks
+        materialize every page before returning, and kicks off the fetch of
+        the next page on a background worker before yielding the current one,
+        so per-page work (symbol resolution, holdings updates) overlaps with
+        the next fetch and peak memory stays at one page.
+        """
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(
+                rh.helper.request_get,
+                'https://api.robinhood.com/positions/?nonzero=true', 'regular')
+            while future is not None:
+                response = future.result()
+                next_url = response.get('next')
+                future = (executor.submit(rh.helper.request_get, next_url, 'regular')
+                          if next_url else None)
+                yield response['results']
+
+    @staticmethod
+    def _fetch_symbol(url):
+        # Hits the instrument url directly on the pooled session, skipping the
+        # extra bookkeeping rh.get_instrument_by_url does per call.
+        return rh.helper.request_get(url, 'regular')['symbol']
+
+    def get_portfolio(self, max_age=0):
+        """
+        Get symbols in portfolio. Used to determine if we can sell a position.
+
+        Returns the already-fetched holdings when they are younger than max_age
+        seconds; the default of 0 always refetches.
+        """
+        if max_age and monotonic() - self._portfolio_ts < max_age:
+            return self.portfolio
 
         holdings = rh.build_holdings()
-        stock_data = rh.get_open_stock_positions()
-        for stock in stock_data:
-            stock_info = rh.get_instrument_by_url(stock['instrument'])
-            symbol = stock_info['symbol']
-            if symbol in holdings:
-                buy_time = pd.to_datetime(stock['created_at']).tz_convert('US/Eastern')
-                holdings[symbol]['created_at'] = buy_time
+        for stock_data in self._paged_positions():
+            symbols = self._resolve_symbols([stock['instrument'] for stock in stock_data])
+            for stock in stock_data:
+                symbol = symbols[stock['instrument']]
+                if symbol in holdings:
+                    buy_time = dt.datetime.fromisoformat(
+                        stock['created_at'].replace('Z', '+00:00')).astimezone(_TZ)
+                    holdings[symbol]['created_at'] = buy_time
         self.portfolio = holdings
-        self.portfolio_symbols = list(holdings.keys())
+        self.portfolio_symbols = frozenset(holdings)
+        self._portfolio_ts = monotonic()
         return holdings
 
         # for option in options_data:
@@ -58,12 +264,26 @@ class RobinHoodBot:
         #     print(info)
         #     strike_price
         #     chain_symbol
-    
+
+    def invalidate_portfolio(self):
+        """Force the next get_portfolio call to refetch holdings. """
+        self._portfolio_ts = 0.0
+
+    @ttl_cache(30)
     def get_watchlist(self, watchlist):
         """Get list of symbols from robinhood watchlist. """
         stockList = rh.get_watchlist_by_name(name=watchlist)
         return [stock['symbol'] for stock in stockList['results']]
 
+    @staticmethod
+    def _submit_order(dispatch, symbol, order_type, **kwargs):
+        """Submit via the specialized submitter for order_type. """
+        try:
+            submit = dispatch[order_type]
+        except KeyError:
+            raise ValueError("Unsupported order type: ", order_type) from None
+        return submit(symbol, kwargs)
+
     def buy_stock(self, symbol, order_type, price=None, quantity=None, dollar_amount=None):
         """Submit a buy order
         Args:
@@ -76,40 +296,15 @@ class RobinHoodBot:
         Returns:
             buy_order (dict): robinhood object with details of order
         """
-        if order_type == 'fractional_price':
-            if dollar_amount is None:
-                raise ValueError("No dollar amount specified.")
-            if dollar_amount < 0:
-                raise ValueError("Negative dollar amount.")
-            buy_order = rh.orders.order_buy_fractional_by_price(symbol, dollar_amount)
-        elif order_type == 'fractional_quantity':
-            if quantity is None:
-                raise ValueError("No quantity specified.")
-            if quantity < 0:
-                raise ValueError("Negative quantity.")
-            buy_order = rh.orders.order_buy_fractional_by_quantity(symbol, quantity)
-        elif order_type == 'limit':
-            if price is None or quantity is None:
-                raise ValueError("No price or quantity specified.")
-            if quantity < 0 or price < 0:
-                raise ValueError("Negative quantity or price.")
-            buy_order = rh.orders.order_buy_limit(symbol, int(quantity), price)
-        elif order_type == 'market':
-            if quantity is None:
-                raise ValueError("No quantity specified.")
-            if quantity < 0:
-                raise ValueError("Negative quantity.")
-            buy_order = rh.orders.order_buy_market(symbol, int(quantity))
-        # elif order_type == 'stop_limit':
-        #     buy_order = rh.orders.order_buy_stop_limit(symbol, price)
-        else:
-            raise ValueError("Unsupported buy order type: ", order_type)
+        buy_order = self._submit_order(_BUY_DISPATCH, symbol, order_type,
+                                       price=price, quantity=quantity, dollar_amount=dollar_amount)
         print(f"BUY ORDER SUBMITTED {symbol} {order_type}")
         buy_order['symbol'] = symbol
         if 'id' not in buy_order:
             print("FAILED ORDER", buy_order)
         else:
             self.open_orders[buy_order['id']] = buy_order
+            self.invalidate_portfolio()
         return buy_order
 
     def sell_stock(self, symbol, order_type, price=None, quantity=None, dollar_amount=None):
@@ -124,37 +319,14 @@ class RobinHoodBot:
         Returns:
             sell_order (dict): robinhood object with details of order
         """
-        if order_type == 'fractional_price':
-            if dollar_amount is None:
-                raise ValueError("No dollar amount specified")
-            if dollar_amount < 0:
-                raise ValueError("Negative dollar amount.")
-            sell_order = rh.orders.order_sell_fractional_by_price(symbol, dollar_amount)
-        elif order_type == 'fractional_quantity':
-            if quantity is None:
-                raise ValueError("No quantity specified")
-            if quantity < 0:
-                raise ValueError("Negative quantity.")
-            sell_order = rh.orders.order_sell_fractional_by_quantity(symbol, quantity)
-        elif order_type == 'limit':
-            if price is None or quantity is None:
-                raise ValueError("No price or quantity specified")
-            if quantity < 0 or price < 0:
-                raise ValueError("Negative quantity or price.")
-            sell_order = rh.orders.order_sell_limit(symbol, int(quantity), price)
-        elif order_type == 'market':
-            if quantity is None:
-                raise ValueError("No quantity specified")
-            if quantity < 0:
-                raise ValueError("Negative quantity.")
-            sell_order = rh.orders.order_sell_market(symbol, int(quantity))
-        else:
-            raise ValueError("Unsupported buy order type: ", order_type)
+        sell_order = self._submit_order(_SELL_DISPATCH, symbol, order_type,
+                                        price=price, quantity=quantity, dollar_amount=dollar_amount)
         sell_order['symbol'] = symbol
         if 'id' not in sell_order:
             print("FAILED ORDER", sell_order)
         else:
             self.open_orders[sell_order['id']] = sell_order
+            self.invalidate_portfolio()
         print(f"SELL ORDER SUBMITTED {symbol} {order_type}")
         return sell_order
 
@@ -168,43 +340,83 @@ class RobinHoodBot:
 
     def get_all_open_stock_orders(self):
         orders = rh.orders.get_all_open_stock_orders()
+        symbols = self._resolve_symbols([order['instrument'] for order in orders])
         order_dict = {}
         for order in orders:
-            stock_info = rh.get_instrument_by_url(order['instrument'])
-            symbol = stock_info['symbol']
-            order['symbol'] = symbol
+            order['symbol'] = symbols[order['instrument']]
             order_dict[order['id']] = order
         return order_dict
     
     def update_open_orders(self):
-        remove_orders = []
+        """Drop orders that have reached a terminal state.
+
+        Fetches order status with one bulk request rather than one
+        get_stock_order_info call per open order.
+        """
+        all_orders = rh.orders.get_all_stock_orders()
+        orders_by_id = {order['id']: order for order in all_orders}
         for order_id in self.open_orders:
-            order_info = rh.get_stock_order_info(order_id)
-            print(order_info)
-            if order_info['state'] == 'filled' or order_info['state'] == 'cancelled':
-                remove_orders.append(order_id)
-            elif order_info['state'] == 'rejected':
-                print(f"Rejected order {order_id} because {order_info['reject_reason']}")
-                remove_orders.append(order_id)
-        for id in remove_orders:
-            del self.open_orders[id]
+            order_info = orders_by_id.get(order_id)
+            if order_info is None:
+                continue
+            log.debug("order %s: %s", order_id, order_info)
+            if order_info['state'] == 'rejected':
+                log.info("Rejected order %s because %s", order_id, order_info['reject_reason'])
+        self.open_orders = {
+            order_id: order for order_id, order in self.open_orders.items()
+            if (info := orders_by_id.get(order_id)) is None or info['state'] not in _TERMINAL_STATES
+        }
 
+    @ttl_cache(5)
     def get_cash(self):
         profile = rh.account.build_user_profile()
         return float(profile['cash'])
 
     def market_open(self):
         """Determine if market is currently open. """
-        tz = pytz.timezone('US/Eastern')
-        time = dt.datetime.now().astimezone(tz).time()
-        open = dt.time(9, 30, 0, tzinfo=tz)
-        close = dt.time(16, 0, 0, tzinfo=tz)
-        return open < time < close
+        now = dt.datetime.now(_TZ).time()
+        return _MARKET_OPEN < now < _MARKET_CLOSE
+
+    def _refresh_prices(self):
+        """Refresh the price cache with one batched quote request. """
+        # get_latest_price dedupes its input, so zip against the same deduped
+        # list to keep symbols and prices aligned.
+        symbols = list(dict.fromkeys(self.stocks))
+        prices = rh.stocks.get_latest_price(symbols)
+        cache = {}
+        for symbol, price in zip(symbols, prices):
+            if price is None:
+                log.info("No quote for %s", symbol)
+                continue
+            cache[symbol] = float(price)
+        self._price_cache = cache
+        self._price_ts = monotonic()
+        return self._price_cache
+
+    def price(self, symbol, max_age=10):
+        """Latest price for symbol, served from the per-tick bulk quote cache.
+
+        Strategies should call this instead of get_latest_price so N symbol
+        lookups per tick cost at most one HTTP request.
+        """
+        if monotonic() - self._price_ts > max_age:
+            self._refresh_prices()
+        return self._price_cache[symbol]
 
     def trade(self):
-        """Execute trading strategy. """
+        """Execute trading strategy.
+
+        Polls prices with one batched request per tick and only wakes the
+        strategy when a quote actually changed, so idle ticks do no work
+        beyond the poll itself.
+        """
+        last_prices = None
         while self.market_open():
-            prices = rh.stocks.get_latest_price(self.stocks)
+            prices = self._refresh_prices()
+            if prices != last_prices:
+                last_prices = prices
+                if self.strategy is not None:
+                    self.strategy(self, prices)
 
             sleep(10)
 
@@ -215,6 +427,7 @@ class RobinHoodBot:
 
 
 def main():
+    logging.basicConfig(level=logging.INFO)
     trader = RobinHoodBot(RH_USERNAME, RH_PASSWORD, watchlist='bot')
     # for i in range(5):
     #     trader.buy_stock('SOFI', 'limit', price=1, quantity=1)